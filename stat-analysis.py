@@ -1,106 +1,247 @@
+import os
+import glob
+import contextlib
 import json
+import hashlib
 import pytz
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from datetime import datetime
+from matplotlib.collections import PatchCollection
+from matplotlib.patches import Rectangle
 
-def load_chrome_history(chrome_file):
-    """Extract browsing history from Chrome JSON session data."""
-    with open(chrome_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    orjson = None
+try:
+    import ijson
+except ImportError:  # ijson is optional; without it files are parsed whole
+    ijson = None
+else:
+    # Only the yajl2_c backend streams fast enough to beat parsing the file whole
+    if ijson.backend_name != "yajl2_c":
+        ijson = None
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; the kernels then run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+    prange = range
 
-    records = []
-    eastern = pytz.timezone("US/Eastern")
+_EASTERN = pytz.timezone("US/Eastern")
+
+# January 2025 in US/Eastern, as a half-open [start, end) window
+_JAN_LO = pd.Timestamp("2025-01-01", tz=_EASTERN)
+_JAN_HI = pd.Timestamp("2025-02-01", tz=_EASTERN)
+
+def _load_json(path):
+    """Parse a JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _iter_json_items(path, prefix):
+    """Yield the values found at an ijson-style prefix such as "history.item".
+
+    With ijson's C backend installed the file is streamed so only one entry
+    is held in memory at a time, trading some speed against orjson for flat
+    memory use; otherwise the whole document is parsed up front.
+    """
+    if ijson is not None:
+        with open(path, 'rb') as f:
+            yield from ijson.items(f, prefix, use_float=True)
+        return
+
+    nodes = [_load_json(path)]
+    for key in prefix.split("."):
+        if key == "item":
+            nodes = [item for node in nodes for item in node]
+        else:
+            nodes = [node[key] for node in nodes if key in node]
+    yield from nodes
+
+def _epoch_bound(bound, ns_per_unit, default):
+    """Convert one tz-aware window bound to an integer epoch offset, rounding up."""
+    if bound is None:
+        return default
+    bound = pd.Timestamp(bound)
+    if bound.tz is None:
+        raise ValueError(f"History window bounds must be timezone-aware, got {bound}")
+    return -(-bound.value // ns_per_unit)
+
+def _epoch_bounds(start, end, ns_per_unit):
+    """Convert an optional [start, end) window to integer epoch bounds in a coarser unit."""
+    return _epoch_bound(start, ns_per_unit, float("-inf")), _epoch_bound(end, ns_per_unit, float("inf"))
+
+def _chrome_columns(chrome_file, start, end):
+    """Read Chrome history as parallel (epoch microseconds, urls, titles) columns."""
+    timestamps, urls, titles = [], [], []
+    lo_ms, hi_ms = _epoch_bounds(start, end, 10**6)
 
     # Extract history from session tabs
-    for session in data.get("Session", []):
-        tab = session.get("tab", {})
-        for entry in tab.get("navigation", []):
-            timestamp_s = entry.get("timestamp_msec", 0) / 1000  # Convert milliseconds to seconds
-            dt_utc = datetime.utcfromtimestamp(timestamp_s).replace(tzinfo=pytz.utc)
-            dt_est = dt_utc.astimezone(eastern)
+    for entry in _iter_json_items(chrome_file, "Session.item.tab.navigation.item"):
+        timestamp_msec = entry.get("timestamp_msec", 0)
+        if not lo_ms <= timestamp_msec < hi_ms:
+            continue
 
-            records.append({"datetime_est": dt_est, "url": entry.get("virtual_url", ""), "title": entry.get("title", "")})
+        timestamps.append(timestamp_msec)
+        urls.append(entry.get("virtual_url", ""))
+        titles.append(entry.get("title", ""))
 
-    return pd.DataFrame(records)
+    return np.asarray(timestamps, dtype=np.int64) * 1000, urls, titles
 
-def load_safari_history(safari_file):
-    """Extract browsing history from Safari JSON data."""
-    with open(safari_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+def _safari_columns(safari_file, start, end):
+    """Read Safari history as parallel (epoch microseconds, urls, titles) columns."""
+    timestamps, urls, titles = [], [], []
+    lo_us, hi_us = _epoch_bounds(start, end, 10**3)
 
-    records = []
-    eastern = pytz.timezone("US/Eastern")
+    for entry in _iter_json_items(safari_file, "history.item"):
+        time_usec = entry.get("time_usec", 0)
+        if not lo_us <= time_usec < hi_us:
+            continue
 
-    for entry in data.get("history", []):
-        timestamp_s = entry.get("time_usec", 0) / 1e6  # Convert microseconds to seconds
-        dt_utc = datetime.utcfromtimestamp(timestamp_s).replace(tzinfo=pytz.utc)
-        dt_est = dt_utc.astimezone(eastern)
+        timestamps.append(time_usec)
+        urls.append(entry.get("url", ""))
+        titles.append(entry.get("title", ""))
 
-        records.append({"datetime_est": dt_est, "url": entry.get("url", ""), "title": entry.get("title", "")})
+    return np.asarray(timestamps, dtype=np.int64), urls, titles
 
-    return pd.DataFrame(records)
+def _history_frame(timestamps_us, urls, titles):
+    """Build a history DataFrame, converting epoch microseconds to US/Eastern in one call."""
+    datetime_utc = pd.to_datetime(timestamps_us, unit="us", utc=True)
+    return pd.DataFrame({"datetime_est": datetime_utc.tz_convert(_EASTERN), "url": urls, "title": titles})
+
+def load_chrome_history(chrome_file, start=None, end=None):
+    """Extract browsing history from Chrome JSON session data.
+
+    When ``start``/``end`` are given, only entries in [start, end) are kept;
+    both must be timezone-aware (``datetime`` or ``pd.Timestamp``).
+    """
+    return _history_frame(*_chrome_columns(chrome_file, start, end))
+
+def load_safari_history(safari_file, start=None, end=None):
+    """Extract browsing history from Safari JSON data.
+
+    When ``start``/``end`` are given, only entries in [start, end) are kept;
+    both must be timezone-aware (``datetime`` or ``pd.Timestamp``).
+    """
+    return _history_frame(*_safari_columns(safari_file, start, end))
+
+def load_browser_history(chrome_file, safari_file, start=None, end=None):
+    """Extract and merge Chrome and Safari browsing history.
+
+    When ``start``/``end`` are given, only entries in [start, end) are kept;
+    both must be timezone-aware (``datetime`` or ``pd.Timestamp``).
+    """
+    chrome_ts, chrome_urls, chrome_titles = _chrome_columns(chrome_file, start, end)
+    safari_ts, safari_urls, safari_titles = _safari_columns(safari_file, start, end)
+    return _history_frame(
+        np.concatenate([chrome_ts, safari_ts]),
+        chrome_urls + safari_urls,
+        chrome_titles + safari_titles
+    )
 
 def filter_to_january_2025(df):
     """Filter browsing history to only include January 2025 records."""
-    eastern = pytz.timezone("US/Eastern")
-    start_jan = eastern.localize(datetime(2025, 1, 1, 0, 0, 0))
-    end_jan = eastern.localize(datetime(2025, 1, 31, 23, 59, 59))
-    return df[(df["datetime_est"] >= start_jan) & (df["datetime_est"] <= end_jan)].copy()
+    if df["datetime_est"].dt.tz is None:
+        raise ValueError("datetime_est must be timezone-aware to filter to January 2025")
+    utc = df["datetime_est"].values  # tz-aware columns expose plain UTC datetime64 values
+    return df[(utc >= _JAN_LO.to_datetime64()) & (utc < _JAN_HI.to_datetime64())]
 
 def aggregate_hourly_activity(df):
     """Aggregate browsing activity by hour per day."""
-    df["date"] = df["datetime_est"].dt.date
-    df["hour"] = df["datetime_est"].dt.hour
-    activity = df.groupby(["date", "hour"]).size().unstack(fill_value=0)
-    return activity.reindex(columns=range(24), fill_value=0)
+    timestamps = df["datetime_est"]
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)  # bucket by local wall-clock time
+    hours = timestamps.to_numpy().astype("datetime64[h]")
+    dates, day_ids = np.unique(hours.astype("datetime64[D]"), return_inverse=True)
+    counts = np.bincount(day_ids * 24 + hours.astype(np.int64) % 24, minlength=len(dates) * 24)
+
+    return pd.DataFrame(
+        counts.reshape(len(dates), 24),
+        index=pd.DatetimeIndex(dates, name="date"),
+        columns=range(24)
+    )
+
+# Typed eagerly so the kernel compiles (or loads from the on-disk cache) at import time
+@njit("Tuple((int8[:], int8[:], int8[:]))(int64[:], int64)", parallel=True, cache=True)
+def _sleep_ranges(masks, min_inactive_hours):
+    """Find the sleep block in each day's 24-bit activity mask.
+
+    Bit h of ``masks[i]`` is set when hour h of day i saw any activity.
+    Returns start hour, end hour and duration arrays, holding -1 for days
+    without an inactive run of at least ``min_inactive_hours``. A run that
+    reaches hour 23 wins whenever it is long enough; otherwise the earliest
+    of the longest runs is used.
+    """
+    n_days = masks.shape[0]
+    starts = np.full(n_days, -1, np.int8)
+    ends = np.full(n_days, -1, np.int8)
+    durations = np.full(n_days, -1, np.int8)
+
+    # Days are independent and each writes only its own output slot
+    for i in prange(n_days):
+        idle = ~masks[i] & 0xFFFFFF
+
+        trailing = 0
+        while trailing < 24 and (idle >> (23 - trailing)) & 1:
+            trailing += 1
+        if trailing >= min_inactive_hours:
+            starts[i] = 24 - trailing
+            ends[i] = 23
+            durations[i] = trailing
+            continue
+
+        # Each runs &= runs >> 1 shortens every run of idle hours by one, so
+        # the step count is the longest run and the bits left one step
+        # before it clears mark where the longest runs begin.
+        longest = 0
+        heads = idle
+        runs = idle
+        while runs:
+            heads = runs
+            runs &= runs >> 1
+            longest += 1
+
+        if longest >= min_inactive_hours:
+            start = 0
+            while not (heads >> start) & 1:
+                start += 1
+            starts[i] = start
+            ends[i] = start + longest - 1
+            durations[i] = longest
+
+    return starts, ends, durations
 
 def compute_sleep_range(activity, min_inactive_hours=5):
     """Determine inferred sleep range based on inactivity periods."""
-    results = []
-    for date, row in activity.iterrows():
-        longest_block = None
-        longest_length = 0
-        current_start = None
-        current_length = 0
-
-        for hour in range(24):
-            if row.get(hour, 0) == 0:
-                if current_start is None:
-                    current_start = hour
-                    current_length = 1
-                else:
-                    current_length += 1
-            else:
-                if current_start is not None:
-                    if current_length >= min_inactive_hours and current_length > longest_length:
-                        longest_block = (current_start, hour - 1)
-                        longest_length = current_length
-                    current_start = None
-                    current_length = 0
-
-        if current_start is not None and current_length >= min_inactive_hours:
-            longest_block = (current_start, 23)
-            longest_length = current_length
-
-        results.append({
-            "date": date,
-            "sleep_start_hour": longest_block[0] if longest_block else None,
-            "sleep_end_hour": longest_block[1] if longest_block else None,
-            "sleep_duration_hours": longest_length if longest_block else None
-        })
-
-    return pd.DataFrame(results)
+    masks = (activity.to_numpy() > 0) @ (1 << np.arange(24, dtype=np.int64))
+    starts, ends, durations = _sleep_ranges(masks, min_inactive_hours)
+
+    found = durations >= 0
+    return pd.DataFrame({
+        "date": activity.index.date,
+        "sleep_start_hour": np.where(found, starts, np.nan),
+        "sleep_end_hour": np.where(found, ends, np.nan),
+        "sleep_duration_hours": np.where(found, durations, np.nan)
+    })
 
 def plot_sleep_gantt(sleep_df):
     """Plot inferred sleep intervals as a Gantt chart."""
-    sleep_df_valid = sleep_df.dropna(subset=["sleep_start_hour", "sleep_end_hour"]).copy()
-    sleep_df_valid.sort_values("date", inplace=True)
+    sleep_df_valid = sleep_df.dropna(subset=["sleep_start_hour", "sleep_end_hour"]).sort_values("date")
+    starts = sleep_df_valid["sleep_start_hour"].to_numpy()
+    durations = sleep_df_valid["sleep_duration_hours"].to_numpy()
     
     fig, ax = plt.subplots(figsize=(10, max(3, 0.3 * len(sleep_df_valid) + 2)))
-    for i, row in enumerate(sleep_df_valid.itertuples()):
-        ax.barh(i, row.sleep_duration_hours, left=row.sleep_start_hour, height=0.4, color="red", alpha=0.7)
+    bars = [Rectangle((start, i - 0.2), duration, 0.4) for i, (start, duration) in enumerate(zip(starts, durations))]
+    ax.add_collection(PatchCollection(bars, facecolor="red", edgecolor="none", alpha=0.7))
     
+    ax.set_ylim(-0.5, max(len(bars), 1) - 0.5)
     ax.set_yticks(range(len(sleep_df_valid)))
     ax.set_yticklabels(sleep_df_valid["date"].astype(str))
     ax.set_xlabel("Hour of Day (US/Eastern)")
@@ -109,21 +250,52 @@ def plot_sleep_gantt(sleep_df):
     plt.tight_layout()
     plt.show()
 
+_CACHE_PREFIX = "sleep_history_cache_"
+
+def _cache_path(*paths):
+    """Name a Parquet cache file after the source files' modification times."""
+    key = repr([os.path.getmtime(path) for path in paths] + [str(_JAN_LO), str(_JAN_HI)])
+    return f"{_CACHE_PREFIX}{hashlib.md5(key.encode()).hexdigest()[:16]}.parquet"
+
+def _load_timestamps_cached(chrome_file, safari_file):
+    """Load the January 2025 datetime_est column, reusing the Parquet cache while the inputs are unchanged."""
+    cache_file = _cache_path(chrome_file, safari_file)
+    if os.path.exists(cache_file):
+        try:
+            return pd.read_parquet(cache_file, columns=["datetime_est"])
+        except (ImportError, OSError, ValueError):  # unreadable or partial cache; rebuild it
+            pass
+
+    # Only the timestamps are used downstream, so url/title are dropped on both paths
+    timestamps = load_browser_history(chrome_file, safari_file, _JAN_LO, _JAN_HI)[["datetime_est"]]
+
+    # Write under a temporary name so an interrupted write never leaves a partial cache behind
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        timestamps.to_parquet(tmp_file, compression="zstd")
+        os.replace(tmp_file, cache_file)
+    except (ImportError, OSError, NotImplementedError):  # no Parquet engine/zstd codec or unwritable dir; skip caching
+        return timestamps
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+    # Drop caches this script wrote for older inputs; a concurrent run may already have removed them
+    for stale_file in glob.glob(f"{_CACHE_PREFIX}*.parquet"):
+        if stale_file != cache_file:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(stale_file)
+    return timestamps
+
 def main():
     chrome_file = "History.json"
     safari_file = "safari.json"
 
-    # Load and merge history
-    chrome_df = load_chrome_history(chrome_file)
-    safari_df = load_safari_history(safari_file)
-    merged = pd.concat([chrome_df, safari_df], ignore_index=True)
-    merged = filter_to_january_2025(merged)
-
-    # Convert timestamps to naive format for Excel export
-    merged["datetime_est"] = merged["datetime_est"].dt.tz_localize(None)
+    # Load and merge January 2025 history timestamps
+    timestamps = _load_timestamps_cached(chrome_file, safari_file)
 
     # Compute hourly activity
-    activity = aggregate_hourly_activity(merged)
+    activity = aggregate_hourly_activity(timestamps)
 
     # Compute sleep range
     sleep_ranges_df = compute_sleep_range(activity)
@@ -0,0 +1,92 @@
+import importlib.util
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Numba's on-disk cache records the importing module's name, so keep the test's
+# compiled kernel away from the one the script writes when run as __main__
+os.environ.setdefault("NUMBA_CACHE_DIR", tempfile.mkdtemp(prefix="numba-cache-"))
+
+_spec = importlib.util.spec_from_file_location(
+    "stat_analysis", os.path.join(os.path.dirname(__file__), "stat-analysis.py")
+)
+stat_analysis = importlib.util.module_from_spec(_spec)
+sys.modules["stat_analysis"] = stat_analysis
+_spec.loader.exec_module(stat_analysis)
+
+def _reference_sleep_range(active_hours, min_inactive_hours):
+    """Straightforward hour-by-hour scan with the original tie-breaking rules."""
+    longest_block = None
+    longest_length = 0
+    current_start = None
+    for hour in range(25):
+        if hour < 24 and hour not in active_hours:
+            if current_start is None:
+                current_start = hour
+            continue
+        if current_start is not None:
+            length = hour - current_start
+            # A long-enough run reaching hour 23 always wins; otherwise keep the earliest longest run
+            if length >= min_inactive_hours and (hour == 24 or length > longest_length):
+                longest_block = (current_start, hour - 1)
+                longest_length = length
+            current_start = None
+    if longest_block is None:
+        return (None, None, None)
+    return (longest_block[0], longest_block[1], longest_length)
+
+def _activity(days):
+    """Build an hourly activity table with one visit in each listed hour."""
+    counts = np.zeros((len(days), 24), dtype=np.int64)
+    for i, active_hours in enumerate(days):
+        counts[i, list(active_hours)] = 1
+    dates = pd.date_range("2025-01-01", periods=len(days), freq="D", name="date")
+    return pd.DataFrame(counts, index=dates, columns=range(24))
+
+def _sleep_tuples(sleep_df):
+    columns = ["sleep_start_hour", "sleep_end_hour", "sleep_duration_hours"]
+    return [
+        tuple(None if pd.isna(value) else int(value) for value in row)
+        for row in sleep_df[columns].itertuples(index=False)
+    ]
+
+def test_compute_sleep_range_edge_cases():
+    days = [
+        set(range(8, 20)),                   # 0-7 idle (8h) wins; trailing 20-23 (4h) is below minimum
+        set(range(10, 18)),                  # trailing 18-23 (6h) beats the longer earlier 0-9 (10h)
+        {5, 11, 17},                         # 0-4, 6-10, 12-16 tie at 5h, 18-23 trailing at 6h
+        {5, 11} | set(range(17, 24)),        # 0-4, 6-10, 12-16 tie at 5h; earliest wins
+        set(),                               # idle all day
+        set(range(5, 24)),                   # exactly min_inactive_hours at the start
+        set(range(0, 19)),                   # exactly min_inactive_hours at the end
+        set(range(24)),                      # never idle
+        set(range(0, 24, 4)),                # only short gaps
+    ]
+    expected = [
+        (0, 7, 8),
+        (18, 23, 6),
+        (18, 23, 6),
+        (0, 4, 5),
+        (0, 23, 24),
+        (0, 4, 5),
+        (19, 23, 5),
+        (None, None, None),
+        (None, None, None),
+    ]
+
+    assert [_reference_sleep_range(active, 5) for active in days] == expected
+    assert _sleep_tuples(stat_analysis.compute_sleep_range(_activity(days), 5)) == expected
+
+def test_compute_sleep_range_matches_reference_scan():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n_days = int(rng.integers(1, 40))
+        min_inactive_hours = int(rng.integers(1, 12))
+        days = [set(np.flatnonzero(rng.random(24) < rng.random())) for _ in range(n_days)]
+
+        expected = [_reference_sleep_range(active, min_inactive_hours) for active in days]
+        result = stat_analysis.compute_sleep_range(_activity(days), min_inactive_hours)
+        assert _sleep_tuples(result) == expected